@@ -16,6 +16,7 @@ from typing import cast as typecast
 
 import json
 import logging
+import operator
 import os
 
 from ipaddress import ip_address
@@ -727,9 +728,17 @@ class IR:
         mapping.check_status()
 
         if mapping.is_active():
-            if mapping.group_id not in self.groups:
+            # group_id is stored in the Mapping's dict, so every mapping.group_id goes
+            # through Resource.__getattr__. Grab it once. (We key on the string itself:
+            # Python caches string hashes, so a long group_id costs nothing extra to
+            # look up, and keying on hash(group_id) would just invite collisions.)
+            group_id = mapping.group_id
+            extant_group = self.groups.get(group_id, None)
+
+            if extant_group is None:
                 # Is this group in our external cache?
-                group_key = mapping.group_class().key_for_id(mapping.group_id)
+                group_class = mapping.group_class()
+                group_key = group_class.key_for_id(group_id)
                 group = self.cache_fetch(group_key)
 
                 if group is not None:
@@ -737,7 +746,6 @@ class IR:
                 else:
                     self.logger.debug(f"IR: synthesizing group for {mapping.name}")
                     group_name = "GROUP: %s" % mapping.name
-                    group_class = mapping.group_class()
                     group = group_class(ir=self, aconf=aconf,
                                         location=mapping.location,
                                         name=group_name,
@@ -753,7 +761,7 @@ class IR:
                 self.groups[group.group_id] = group
             else:
                 self.logger.debug(f"IR: already have group for {mapping.name}")
-                group = self.groups[mapping.group_id]
+                group = extant_group
                 group.add_mapping(aconf, mapping)
 
             return group
@@ -761,7 +769,11 @@ class IR:
             return None
 
     def ordered_groups(self) -> Iterable[IRBaseMappingGroup]:
-        return reversed(sorted(self.groups.values(), key=lambda x: x['group_weight']))
+        # Heaviest groups first. Sorting the groups in reverse insertion order (rather
+        # than reversing the sorted list) keeps groups with equal weights in the same
+        # order that reversed(sorted(...)) would give us.
+        return sorted(list(self.groups.values())[::-1],
+                      key=operator.itemgetter('group_weight'), reverse=True)
 
     def has_cluster(self, name: str) -> bool:
         return name in self.clusters
@@ -1,5 +1,5 @@
 import copy
-from typing import Dict, List, Optional, TYPE_CHECKING
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
 
 import os
 
@@ -288,11 +288,16 @@ class IRHost(IRResource):
         ir.logger.debug(f"Host setup OK: {self.pretty()}")
         return True
 
-    def pretty(self) -> str:
+    def insecure_policy(self) -> Tuple[str, Optional[int]]:
+        # Return the insecure action and additional insecure port from our request policy,
+        # defaulting to redirecting with no additional port.
         request_policy = self.get('requestPolicy', {})
         insecure_policy = request_policy.get('insecure', {})
-        insecure_action = insecure_policy.get('action', 'Redirect')
-        insecure_addl_port = insecure_policy.get('additionalPort', None)
+
+        return insecure_policy.get('action', 'Redirect'), insecure_policy.get('additionalPort', None)
+
+    def pretty(self) -> str:
+        insecure_action, insecure_addl_port = self.insecure_policy()
 
         ctx_name = self.context.name if self.context else "-none-"
         return "<Host %s for %s ctx %s ia %s iap %s>" % (self.name, self.hostname or '*', ctx_name,
@@ -335,17 +340,11 @@ class HostFactory:
             # we have any termination contexts.
             #
             # If we're running as an intercept agent, there should be a Host in all cases.
-            host_count = len(ir.get_hosts() or [])
-
-            # This is mostly mypy silliness to deal with the fact that ir.get_tls_contexts()
-            # returns a ValuesView[IRTLSContext] rather than a List[IRTLSContext].
-            empty_contexts: List[IRTLSContext] = []
-            contexts: List[IRTLSContext] = list(ir.get_tls_contexts()) or empty_contexts
+            host_count = len(ir.hosts)
 
-            found_termination_context = False
-            for ctx in contexts:
-                if ctx.get('hosts'):  # not None and not the empty list
-                    found_termination_context = True
+            # A termination context is one with hosts (not None and not the empty list).
+            # We only care whether there's at least one, so stop at the first.
+            found_termination_context = any(ctx.get('hosts') for ctx in ir.get_tls_contexts())
 
             ir.logger.debug(f"HostFactory: FTC {found_termination_context}, host_count {host_count}")
 
@@ -1,7 +1,8 @@
-from typing import Dict, Optional, Tuple, TYPE_CHECKING
+from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING
 
 import copy
 import json
+import logging
 
 from ..config import Config
 from .irresource import IRResource
@@ -9,6 +10,7 @@ from .irtlscontext import IRTLSContext
 
 if TYPE_CHECKING:
     from .ir import IR
+    from .irhost import IRHost
 
 
 class IRListener (IRResource):
@@ -28,6 +30,13 @@ class IRListener (IRResource):
     definition. See V2Listener for more.
     """
 
+    # IRListener can't usefully declare __slots__: like every Resource it's a dict,
+    # and its attributes live in the dict itself. So declare them here for mypy, and
+    # hand everything to IRResource.__init__ so it all goes into the dict in one go.
+    service_port: int
+    use_proxy_proto: bool
+    redirect_listener: bool
+
     def __init__(self, ir: 'IR', aconf: Config,
                  service_port: int,
                  # require_tls: bool,
@@ -45,11 +54,9 @@ class IRListener (IRResource):
             service_port=service_port,
             # require_tls=require_tls,
             use_proxy_proto=use_proxy_proto,
+            redirect_listener=redirect_listener,
             **kwargs)
 
-        self.redirect_listener: bool = redirect_listener
-        # self.require_tls: bool = require_tls
-
     def pretty(self) -> str:
         ctx = self.get('context', None)
         ctx_name = '-none-' if not ctx else ctx.name
@@ -64,6 +71,29 @@ class ListenerFactory:
     def load_all(cls, ir: 'IR', aconf: Config) -> None:
         amod = ir.ambassador_module
 
+        # Most of the logging below needs pretty() or JSON dumps, so only build those
+        # strings if they're actually going to be logged.
+        log_debug = ir.logger.isEnabledFor(logging.DEBUG)
+
+        # Every listener we create shares the Ambassador module's port and PROXY protocol
+        # settings, and only supports the 'Route' secure action. Build those arguments
+        # once (rather than going through Resource.__getattr__ for every listener) and
+        # reuse them for each IRListener below.
+        listener_args: Dict[str, Any] = dict(
+            ir=ir, aconf=aconf,
+            service_port=amod.service_port,
+            # require_tls=amod.get('x_forwarded_proto_redirect', False),
+            use_proxy_proto=amod.use_proxy_proto,
+            secure_action='Route'
+        )
+
+        # By far the most common case is an unconfigured installation: no Hosts and no
+        # termination contexts. All that needs is the fallback listener, so skip all the
+        # machinery below.
+        if not ir.hosts and not any(ctx.get('hosts') for ctx in ir.get_tls_contexts()):
+            ir.add_listener(cls.fallback_listener(ir, listener_args))
+            return
+
         # An IRListener roughly corresponds to something partway between an Envoy
         # FilterChain and an Envoy VirtualHost -- it's a single domain entry (which
         # could be a wildcard) that can have routes and such associated with it.
@@ -96,38 +126,51 @@ class ListenerFactory:
         unused_contexts: Dict[str, IRTLSContext] = {}
         ctx: Optional[IRTLSContext]
 
+        # Every TLSContext still in the IR here is active (IRAmbassador.finalize drops
+        # any that didn't resolve), so the only thing to filter on is whether it's a
+        # termination context.
         for ctx in ir.get_tls_contexts():
-            if ctx.is_active:
-                ctx_hosts = ctx.get('hosts', [])
+            ctx_hosts = ctx.get('hosts', None)
+
+            if not ctx_hosts:
+                continue
 
-                if ctx_hosts:
-                    # This is a termination context.
-                    for hostname in ctx_hosts:
-                        extant_context = unused_contexts.get(hostname, None)
+            for hostname in ctx_hosts:
+                extant_context = unused_contexts.get(hostname, None)
 
-                        if extant_context:
-                            ir.post_error("TLSContext %s claims hostname %s, which was already claimed by %s" %
-                                          (ctx.name, hostname, extant_context.name))
-                            continue
+                if extant_context:
+                    ir.post_error("TLSContext %s claims hostname %s, which was already claimed by %s" %
+                                  (ctx.name, hostname, extant_context.name))
+                    continue
 
-                        unused_contexts[hostname] = ctx
+                unused_contexts[hostname] = ctx
 
-        # Next, start with an empty set of listeners...
+        # Next, start with an empty set of listeners, and keep track of which Host
+        # claimed each hostname...
         listeners: Dict[str, IRListener] = {}
+        listener_hosts: Dict[str, 'IRHost'] = {}
 
         cls.dump_info(ir, "AT START", listeners, unused_contexts)
 
-        # OK. Walk hosts.
-        hosts = ir.get_hosts() or []
-
-        for host in hosts:
-            ir.logger.debug(f"ListenerFactory: consider Host {host.pretty()}")
+        # OK. Walk hosts. (ir.get_hosts() would copy them into a new list, and we don't
+        # need that: we only ever read them.)
+        for host in ir.hosts.values():
+            if log_debug:
+                ir.logger.debug(f"ListenerFactory: consider Host {host.pretty()}")
 
             hostname = host.hostname
-            request_policy = host.get('requestPolicy', {})
-            insecure_policy = request_policy.get('insecure', {})
-            insecure_action = insecure_policy.get('action', 'Redirect')
-            insecure_addl_port = insecure_policy.get('additionalPort', None)
+
+            # Do we somehow have a collision on the hostname? Check before doing any
+            # more work: only the first Host to claim a given hostname gets a listener.
+            extant_host = listener_hosts.get(hostname, None)
+
+            if extant_host:
+                # Uh whut.
+                ir.post_error("Hostname %s is defined by both Host %s and Host %s?" %
+                              (hostname, extant_host.name, host.name))
+                continue
+
+            insecure_action, insecure_addl_port = host.insecure_policy()
 
             # The presence of a TLSContext matching our hostname is good enough
             # to go on here, so let's see if there is one.
@@ -137,7 +180,9 @@ class ListenerFactory:
             # does, check for mismatches.
             if host.context:
                 if ctx:
-                    if ctx != host.context:
+                    # Normally the Host's context _is_ the one we found, so check identity
+                    # first: comparing two IRTLSContexts for equality walks every key.
+                    if (ctx is not host.context) and (ctx != host.context):
                         # Huh. This is actually "impossible" but let's complain about it
                         # anyway.
                         ir.post_error("Host %s and mismatched TLSContext %s both claim hostname %s?" %
@@ -147,7 +192,9 @@ class ListenerFactory:
 
                     # Force additionalPort to 8080 if it's not set at all.
                     if insecure_addl_port is None:
-                        ir.logger.debug(f"ListenerFactory: Host {hostname} has TLS active, defaulting additionalPort to 8080")
+                        if log_debug:
+                            ir.logger.debug(f"ListenerFactory: Host {hostname} has TLS active, defaulting additionalPort to 8080")
+
                         insecure_addl_port = 8080
                 else:
                     # Huh. This is actually a different kind of "impossible".
@@ -159,7 +206,7 @@ class ListenerFactory:
             # OK, once here, either ctx is not None, or this Host isn't interested in
             # TLS termination.
 
-            if ctx:
+            if ctx and log_debug:
                 ir.logger.debug(f"ListenerFactory: Host {hostname} terminating TLS with context {ctx.name}")
 
                 # We could check for the secure action here, but we're only supporting
@@ -169,28 +216,17 @@ class ListenerFactory:
             # the insecure action, and any additional insecure port. Save everything.
 
             listener = IRListener(
-                ir=ir, aconf=aconf, location=host.location,
-                service_port=amod.service_port,
+                location=host.location,
                 hostname=hostname,
-                # require_tls=amod.get('x_forwarded_proto_redirect', False),
-                use_proxy_proto=amod.use_proxy_proto,
                 context=ctx,
-                secure_action='Route',
                 insecure_action=insecure_action,
-                insecure_addl_port=insecure_addl_port
+                insecure_addl_port=insecure_addl_port,
+                **listener_args
             )
 
-            # Do we somehow have a collision on the hostname?
-            extant_listener = listeners.get(hostname, None)
-
-            if extant_listener:
-                # Uh whut.
-                ir.post_error("Hostname %s is defined by both Host %s and Host %s?" %
-                              (hostname, extant_listener.name, listener.name))
-                continue
-
             # OK, so far so good. Save what we have so far...
             listeners[hostname] = listener
+            listener_hosts[hostname] = host
 
             # ...make sure we don't try to use this hostname's TLSContext again...
             unused_contexts.pop(hostname, None)
@@ -198,13 +234,15 @@ class ListenerFactory:
         cls.dump_info(ir, "AFTER HOSTS", listeners, unused_contexts)
 
         # Walk the remaining unused contexts, if any, and turn them into listeners too.
+        edge_stack_allowed = ir.edge_stack_allowed
+
         for hostname, ctx in unused_contexts.items():
             insecure_action = 'Reject'
             insecure_addl_port = None
 
             redirect_cleartext_from = ctx.get('redirect_cleartext_from', None)
 
-            if ir.edge_stack_allowed and ctx.is_fallback:
+            if edge_stack_allowed and ctx.is_fallback:
                 # If this is the fallback context in Edge Stack, force redirection:
                 # this way the fallback context will listen on both ports, to make
                 # things easier on the user.
@@ -215,15 +253,12 @@ class ListenerFactory:
                 insecure_addl_port = redirect_cleartext_from
 
             listener = IRListener(
-                ir=ir, aconf=aconf, location=ctx.location,
-                service_port=amod.service_port,
+                location=ctx.location,
                 hostname=hostname,
-                # require_tls=amod.get('x_forwarded_proto_redirect', False),
-                use_proxy_proto=amod.use_proxy_proto,
                 context=ctx,
-                secure_action='Route',
                 insecure_action=insecure_action,
-                insecure_addl_port=insecure_addl_port
+                insecure_addl_port=insecure_addl_port,
+                **listener_args
             )
 
             listeners[hostname] = listener
@@ -233,25 +268,9 @@ class ListenerFactory:
         cls.dump_info(ir, "AFTER CONTEXTS", listeners, unused_contexts)
 
         # If we have no listeners, that implies that we had no Hosts _and_ no termination contexts,
-        # so let's synthesize a fallback listener. We'll default to using Route as the insecure action
-        # (which means accepting either TLS or cleartext), but x_forwarded_proto_redirect can override
-        # that.
-
-        xfp_redirect = amod.get('x_forwarded_proto_redirect', False)
-        insecure_action = "Redirect" if xfp_redirect else "Route"
-
+        # so let's synthesize a fallback listener.
         if not listeners:
-            listeners['*'] = IRListener(
-                ir=ir, aconf=aconf, location=amod.location,
-                service_port=amod.service_port,
-                hostname='*',
-                # require_tls=amod.get('x_forwarded_proto_redirect', False),
-                use_proxy_proto=amod.use_proxy_proto,
-                context=None,
-                secure_action='Route',
-                insecure_action=insecure_action,
-                insecure_addl_port=None
-            )
+            listeners['*'] = cls.fallback_listener(ir, listener_args)
 
         cls.dump_info(ir, "AFTER FALLBACK", listeners, unused_contexts)
 
@@ -259,8 +278,30 @@ class ListenerFactory:
         for hostname, listener in listeners.items():
             ir.add_listener(listener)
 
+    @classmethod
+    def fallback_listener(cls, ir: 'IR', listener_args: Dict[str, Any]) -> IRListener:
+        # The fallback listener accepts any hostname. We'll default to using Route as the
+        # insecure action (which means accepting either TLS or cleartext), but
+        # x_forwarded_proto_redirect can override that.
+        amod = ir.ambassador_module
+
+        xfp_redirect = amod.get('x_forwarded_proto_redirect', False)
+        insecure_action = "Redirect" if xfp_redirect else "Route"
+
+        return IRListener(
+            location=amod.location,
+            hostname='*',
+            context=None,
+            insecure_action=insecure_action,
+            insecure_addl_port=None,
+            **listener_args
+        )
+
     @classmethod
     def dump_info(cls, ir, what, listeners, unused_contexts):
+        if not ir.logger.isEnabledFor(logging.DEBUG):
+            return
+
         ir.logger.debug(f"ListenerFactory: {what}")
 
         pretty_listeners = {k: v.pretty() for k, v in listeners.items()}
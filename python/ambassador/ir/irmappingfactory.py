@@ -1,5 +1,7 @@
 from typing import Any, ClassVar, Dict, List, Optional, Tuple, Type, Union, TYPE_CHECKING
 
+import logging
+
 from ..config import Config
 
 from .irbasemapping import IRBaseMapping
@@ -40,6 +42,10 @@ class MappingFactory:
 
         assert(len(config_info) > 0)    # really rank paranoia on my part...
 
+        # There can be a _lot_ of Mappings, so don't format log messages that won't
+        # be logged anyway.
+        log_debug = ir.logger.isEnabledFor(logging.DEBUG)
+
         for config in config_info.values():
             # ir.logger.debug("creating mapping for %s" % repr(config))
 
@@ -51,7 +57,6 @@ class MappingFactory:
 
             if cached_mapping is None:
                 # Cache miss: synthesize a new Mapping.
-                ir.logger.debug(f"IR: synthesizing Mapping for {config.name}")
                 mapping = mapping_class(ir, aconf, **config)
             else:
                 # Cache hit. We know a priori that anything in the cache under a Mapping
@@ -59,7 +64,12 @@ class MappingFactory:
                 assert(isinstance(cached_mapping, IRBaseMapping))
                 mapping = cached_mapping
                
-            ir.logger.debug(f"IR: adding Mapping for {config.name}")
+            # One log line per Mapping is plenty, so say whether it came from the cache here
+            # rather than logging the cache miss separately.
+            if log_debug:
+                how = "synthesized" if cached_mapping is None else "cached"
+                ir.logger.debug(f"IR: adding {how} Mapping for {config.name}")
+
             ir.add_mapping(aconf, mapping)
 
     @classmethod